@@ -0,0 +1,217 @@
+# This file is part of dotmgr.
+#
+# dotmgr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# dotmgr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with dotmgr.  If not, see <http://www.gnu.org/licenses/>.
+"""A module for the content-addressed cache of specialized dotfiles.
+"""
+
+from fcntl import ioctl
+from filecmp import cmp
+from hashlib import sha256
+from os import O_CREAT, O_EXCL, O_WRONLY, R_OK, access, fstat, getpid, makedirs, remove,\
+               replace, scandir, utime
+from os import open as os_open
+from os.path import dirname, isfile, join
+from shutil import copyfileobj, copymode
+
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+CACHE_FORMAT_VERSION = 1
+
+# Linux ioctl request for cloning a file into another (reflink)
+FICLONE = 0x40049409
+
+class RenderCache(object):
+    """An instance of this class caches specialized dotfiles.
+
+    Entries are keyed by a hash of the generic content and the normalized tag set, so the cache
+    can be shared by several stages and user accounts specializing the same repository with the
+    same tags. Least recently used entries are evicted when the cache exceeds its maximum size.
+
+    Entries are placed on stage by reflink where the file system supports it and copied otherwise.
+    They are never hard-linked, because editing a staged dotfile in place would then also modify
+    the cache entry and every other stage sharing it.
+
+    Entries keep the permission bits of the specialized dotfile they were created from, so private
+    dotfiles stay private. Entries that are not readable, e.g. private entries of other users of a
+    shared cache, are treated as misses. Other errors accessing the cache are reported as warnings
+    and make the caller fall back to uncached specialization.
+
+    Attributes:
+        log:      The log to write messages to.
+        max_size: The maximum total size of all entries in bytes.
+        path:     The absolute path to the cache directory.
+    """
+
+    def __init__(self, cache_path, log, max_size=DEFAULT_CACHE_SIZE):
+        self.log = log
+        self.max_size = max_size
+        self.path = cache_path
+        self._size = None
+        self._writable = True
+
+    def key(self, generic_content, tags):
+        """Computes the cache key for a generic dotfile.
+
+        Args:
+            generic_content: The raw content of the generic dotfile.
+            tags:            The tags the dotfile is specialized for.
+
+        Returns:
+            The cache key.
+        """
+        digest = sha256('{}:{}\0'.format(CACHE_FORMAT_VERSION,
+                                         ' '.join(sorted(set(tags)))).encode('utf-8'))
+        digest.update(generic_content)
+        return digest.hexdigest()
+
+    def place(self, key, destination):
+        """Places a cached specialized dotfile on stage.
+
+        Args:
+            key:         The cache key.
+            destination: The absolute path to the dotfile on stage.
+
+        Returns:
+            `None` if there is no entry for the key, `True` if the dotfile on stage was replaced
+            and `False` if it already had the cached content.
+        """
+        entry = join(self.path, key)
+        if not isfile(entry) or not access(entry, R_OK):
+            self.log.debug('Cache miss for {}', destination)
+            return None
+        try:
+            utime(entry)
+        except PermissionError:
+            # Entries created by other users of a shared cache may not be touched
+            pass
+
+        try:
+            try:
+                if cmp(entry, destination, shallow=False):
+                    return False
+            except FileNotFoundError:
+                pass
+            self.log.debug('Cache hit for {}', destination)
+            makedirs(dirname(destination), exist_ok=True)
+            _clone(entry, destination, True)
+        except OSError as err:
+            self.log.warning('Could not use cache entry {}: {}', entry, err.strerror)
+            return None
+        return True
+
+    def put(self, key, source):
+        """Adds a specialized dotfile to the cache and evicts old entries if necessary.
+
+        If the cache cannot be written to, a warning is generated once and further entries are
+        not added.
+
+        Args:
+            key:    The cache key.
+            source: The absolute path to the specialized dotfile on stage.
+        """
+        if not self._writable:
+            return
+        try:
+            makedirs(self.path, mode=0o700, exist_ok=True)
+            size = self._get_size()
+            self._size = size + _clone(source, join(self.path, key), False)
+            if self._size > self.max_size:
+                self.trim()
+        except OSError as err:
+            self.log.warning('Could not write to cache {}: {}', self.path, err.strerror)
+            self._writable = False
+
+    def trim(self):
+        """Evicts least recently used entries until the cache does not exceed its maximum size.
+        """
+        entries = []
+        size = 0
+        for entry in scandir(self.path):
+            if entry.is_file() and '.' not in entry.name:
+                info = entry.stat()
+                entries.append((info.st_mtime, info.st_size, entry.path))
+                size += info.st_size
+
+        entries.sort()
+        for _, entry_size, entry_path in entries:
+            if size <= self.max_size:
+                break
+            self.log.debug('Evicting cache entry {}', entry_path)
+            try:
+                remove(entry_path)
+            except FileNotFoundError:
+                pass
+            except OSError as err:
+                # Entries of other users in a shared cache may not be removable
+                self.log.debug('Could not evict cache entry {}: {}', entry_path, err.strerror)
+                continue
+            size -= entry_size
+        self._size = size
+
+    def _get_size(self):
+        """Lazy getter for the total size of all entries.
+        """
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in scandir(self.path)
+                             if entry.is_file() and '.' not in entry.name)
+        return self._size
+
+def _clone(source, destination, keep_mode):
+    """Atomically replaces a file with a reflink to or a copy of another file.
+
+    The copy is only accessible to the current user until it has been given its final permission
+    bits, which are taken from the source file unless `keep_mode` is set and the destination
+    already exists.
+
+    Args:
+        source:      The absolute path to the file to clone.
+        destination: The absolute path to the file to replace.
+        keep_mode:   If set to `True`, the permission bits of an existing destination are kept.
+
+    Returns:
+        The size of the file in bytes.
+    """
+    temp_path = '{}.{}.tmp'.format(destination, getpid())
+    try:
+        with open(source, 'rb') as source_file, \
+             open(temp_path, 'wb', opener=_open_private) as temp_file:
+            try:
+                ioctl(temp_file.fileno(), FICLONE, source_file.fileno())
+            except OSError:
+                copyfileobj(source_file, temp_file)
+            size = fstat(source_file.fileno()).st_size
+        try:
+            copymode(destination if keep_mode else source, temp_path)
+        except FileNotFoundError:
+            copymode(source, temp_path)
+        replace(temp_path, destination)
+    except OSError:
+        try:
+            remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return size
+
+def _open_private(path, flags):
+    """Opener for new files that are only accessible to the current user.
+
+    Args:
+        path:  The path to the file to create.
+        flags: The flags to open the file with.
+
+    Returns:
+        The file descriptor.
+    """
+    return os_open(path, flags | O_CREAT | O_EXCL, 0o600)
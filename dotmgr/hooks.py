@@ -0,0 +1,154 @@
+# This file is part of dotmgr.
+#
+# dotmgr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# dotmgr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with dotmgr.  If not, see <http://www.gnu.org/licenses/>.
+"""A module for post-specialization hooks.
+
+Hooks are shell commands that are executed after dotfiles matching a glob pattern have changed.
+They are defined in a hook configuration file in the following format:
+
+    .tmux.conf: tmux source-file ~/.tmux.conf
+    .config/fontconfig/*: fc-cache -f
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fnmatch import fnmatch
+from os import killpg
+from os.path import expanduser
+from signal import SIGKILL
+from subprocess import STDOUT, Popen, TimeoutExpired
+from tempfile import TemporaryFile
+from time import monotonic
+
+
+DEFAULT_HOOK_JOBS = 4
+DEFAULT_HOOK_TIMEOUT = 60
+
+def read_hooks(hook_config_path, log):
+    """Parses a hook configuration file.
+
+    Empty lines and lines starting with `#` are ignored.
+
+    Args:
+        hook_config_path: The absolute path to the hook configuration file.
+        log:              The log to write messages to.
+
+    Returns:
+        A list of `(pattern, command)` tuples or an empty list if the file does not exist.
+    """
+    try:
+        with open(hook_config_path) as hook_config:
+            lines = hook_config.readlines()
+    except FileNotFoundError:
+        return []
+
+    hooks = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if ':' not in line:
+            log.warning('Ignoring malformed hook definition "{}"', line)
+            continue
+        pattern, command = line.split(':', 1)
+        hooks.append((pattern.strip(), command.strip()))
+    log.debug('Found {} hooks in {}', len(hooks), hook_config_path)
+    return hooks
+
+def run_hooks(hooks, dotfile_paths, log, jobs=DEFAULT_HOOK_JOBS, timeout=DEFAULT_HOOK_TIMEOUT):
+    """Executes all hooks whose pattern matches at least one of the given dotfiles.
+
+    Every command is executed at most once, even if it is triggered by several dotfiles or defined
+    for several patterns. Commands run concurrently in the user's home directory. A command that
+    does not finish within the timeout is killed and counts as failed.
+
+    Args:
+        hooks:         A list of `(pattern, command)` tuples as returned by `read_hooks`.
+        dotfile_paths: The relative paths to the dotfiles that have changed.
+        log:           The log to write messages to.
+        jobs:          The maximum number of hooks that are executed at the same time.
+        timeout:       The number of seconds after which a hook is killed.
+
+    Returns:
+        `True` if all triggered hooks succeeded, `False` otherwise.
+    """
+    commands = []
+    for pattern, command in hooks:
+        if command in commands:
+            continue
+        for dotfile_path in dotfile_paths:
+            if fnmatch(dotfile_path, pattern):
+                log.debug('{} triggers hook `{}`', dotfile_path, command)
+                commands.append(command)
+                break
+    if not commands:
+        return True
+
+    log.info('Running {} hooks', len(commands))
+    log.flush()
+    success = True
+    start = monotonic()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_run_hook, command, timeout): command
+                   for command in commands}
+        for future in as_completed(futures):
+            returncode, output, duration = future.result()
+            if returncode == 0:
+                log.info('Hook `{}` finished in {:.2f}s', futures[future], duration)
+                log.event('hooked', None, 'Hook `{}` succeeded', futures[future])
+                if output:
+                    log.debug('{}', output.rstrip('\n'))
+            elif returncode is None:
+                success = False
+                log.warning('Hook `{}` timed out after {:.2f}s', futures[future], duration)
+                if output:
+                    log.info('{}', output.rstrip('\n'))
+            else:
+                success = False
+                log.warning('Hook `{}` failed with exit status {} after {:.2f}s',
+                            futures[future], returncode, duration)
+                if output:
+                    log.info('{}', output.rstrip('\n'))
+            log.flush()
+    log.info('Hooks finished in {:.2f}s', monotonic() - start)
+    return success
+
+def _run_hook(command, timeout):
+    """Executes a hook command in a shell.
+
+    The command runs in a session of its own, so that on timeout the shell and everything it
+    started can be killed. Its output is captured in a temporary file rather than a pipe, so
+    commands that leave processes running in the background (e.g. to restart a service) finish
+    as soon as the shell exits.
+
+    Args:
+        command: The command to execute.
+        timeout: The number of seconds after which the command is killed.
+
+    Returns:
+        A tuple of the exit status (`None` if the command timed out), the combined output and the
+        runtime in seconds.
+    """
+    start = monotonic()
+    with TemporaryFile('w+') as output_file:
+        process = Popen(command, shell=True, cwd=expanduser('~'), stdout=output_file,
+                        stderr=STDOUT, universal_newlines=True, start_new_session=True)
+        try:
+            returncode = process.wait(timeout=timeout)
+        except TimeoutExpired:
+            killpg(process.pid, SIGKILL)
+            process.wait()
+            returncode = None
+        output_file.seek(0)
+        output = output_file.read()
+    return returncode, output, monotonic() - start
@@ -0,0 +1,152 @@
+# This file is part of dotmgr.
+#
+# dotmgr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# dotmgr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with dotmgr.  If not, see <http://www.gnu.org/licenses/>.
+"""A module for the persisted index of managed dotfiles.
+
+This module must not depend on GitPython (or anything else that is expensive to import), because
+it is used to answer queries from shell prompts and editor integrations.
+"""
+
+from json import dump, load
+from os import getpid, makedirs, replace, stat
+from os.path import dirname, join
+
+
+INDEX_FORMAT_VERSION = 1
+
+class Index(object):
+    """An instance of this class maps managed dotfiles to the state of their stage and repository
+    copies at the time they were last synchronized by dotmgr.
+
+    The index is loaded lazily and only written to disk by `write()` if it was modified.
+
+    Attributes:
+        path:            The absolute path to the index file.
+        stage_path:      The absolute path to the dotfile stage directory.
+        log:             The log to write messages to.
+        repository_path: The absolute path to the dotfile repository.
+    """
+
+    def __init__(self, index_path, stage_path, repository_path, log):
+        self.log = log
+        self.path = index_path
+        self.stage_path = stage_path
+        self.repository_path = repository_path
+        self._entries = None
+        self._modified = False
+
+    def __contains__(self, dotfile_path):
+        return dotfile_path in self._get_entries()
+
+    def _get_entries(self):
+        """Lazy loader for the index entries.
+
+        Entries recorded for a different stage or repository are discarded.
+
+        Returns:
+            A dictionary mapping relative dotfile paths to lists of the form
+            `[stage_mtime, stage_size, repo_mtime, repo_size]`.
+        """
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path) as index_file:
+                    data = load(index_file)
+            except (FileNotFoundError, ValueError):
+                return self._entries
+            if data.get('version') == INDEX_FORMAT_VERSION \
+            and data.get('stage') == self.stage_path \
+            and data.get('repository') == self.repository_path:
+                self._entries = data.get('files', {})
+            else:
+                self.log.debug('Discarding index {} recorded for a different setup', self.path)
+        return self._entries
+
+    def clear(self):
+        """Removes all dotfiles from the index.
+        """
+        self._entries = {}
+        self._modified = True
+
+    def is_dirty(self, dotfile_path):
+        """Checks whether a managed dotfile was modified since dotmgr last synchronized it.
+
+        Args:
+            dotfile_path: The relative path to the dotfile.
+
+        Returns:
+            `True` if the stage or the repository copy differs from the recorded state, `None` if
+            the dotfile is not managed and `False` otherwise.
+        """
+        entry = self._get_entries().get(dotfile_path)
+        if entry is None:
+            return None
+        return _file_state(join(self.stage_path, dotfile_path)) != entry[0:2] \
+            or _file_state(join(self.repository_path, dotfile_path)) != entry[2:4]
+
+    def paths(self):
+        """Returns a sorted list of the relative paths to all managed dotfiles.
+        """
+        return sorted(self._get_entries())
+
+    def remove(self, dotfile_path):
+        """Removes a dotfile from the index.
+
+        Args:
+            dotfile_path: The relative path to the dotfile.
+        """
+        if self._get_entries().pop(dotfile_path, None) is not None:
+            self._modified = True
+
+    def update(self, dotfile_path):
+        """Records the current state of the stage and repository copies of a dotfile.
+
+        Args:
+            dotfile_path: The relative path to the dotfile.
+        """
+        self._get_entries()[dotfile_path] = \
+            _file_state(join(self.stage_path, dotfile_path)) + \
+            _file_state(join(self.repository_path, dotfile_path))
+        self._modified = True
+
+    def write(self):
+        """Atomically writes the index to disk if it was modified.
+        """
+        if not self._modified:
+            return
+        self.log.debug('Writing index {}', self.path)
+        makedirs(dirname(self.path), exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(self.path, getpid())
+        with open(temp_path, 'w') as index_file:
+            dump({'version': INDEX_FORMAT_VERSION,
+                  'stage': self.stage_path,
+                  'repository': self.repository_path,
+                  'files': self._get_entries()}, index_file)
+        replace(temp_path, self.path)
+        self._modified = False
+
+def _file_state(path):
+    """Returns the modification time and size of a file.
+
+    Args:
+        path: The absolute path to the file.
+
+    Returns:
+        A list of the form `[mtime_ns, size]` or `[None, None]` if the file does not exist.
+    """
+    try:
+        info = stat(path)
+    except FileNotFoundError:
+        return [None, None]
+    return [info.st_mtime_ns, info.st_size]
@@ -0,0 +1,163 @@
+# This file is part of dotmgr.
+#
+# dotmgr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# dotmgr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with dotmgr.  If not, see <http://www.gnu.org/licenses/>.
+"""A module for buffered program output.
+"""
+
+from json import dumps
+from sys import stdout
+from time import monotonic, time
+
+
+MODE_TEXT = 'text'
+MODE_QUIET = 'quiet'
+MODE_JSON = 'json'
+
+BUFFER_SIZE = 256
+
+class Log(object):
+    """An instance of this class collects the messages generated by dotmgr.
+
+    Messages are buffered and written in chunks instead of line by line.
+    Message templates are only formatted if the message is actually emitted, so callers should
+    pass arguments separately instead of formatting them beforehand.
+
+    In text mode, messages are written as plain text lines.
+    In quiet mode, only warnings and errors are written, followed by a single summary line.
+    In JSON mode, every message is written as a JSON object on a line of its own.
+
+    Progress is reported with `info` before an operation, while `event` records its completion.
+    Events are counted for the summary in quiet mode and only written in JSON mode.
+
+    Attributes:
+        mode:    One of `MODE_TEXT`, `MODE_QUIET` or `MODE_JSON`.
+        verbose: If set to `True`, debug messages are generated. Always `False` in quiet mode.
+    """
+
+    def __init__(self, mode=MODE_TEXT, verbose=False, stream=stdout):
+        self.mode = mode
+        self.verbose = verbose and mode != MODE_QUIET
+        self._buffer = []
+        self._counts = {}
+        self._start = monotonic()
+        self._stream = stream
+
+    def debug(self, template, *args):
+        """Generates a debug message if verbose mode is enabled.
+
+        Args:
+            template: A message template for `str.format`.
+            args:     The arguments to the template.
+        """
+        if self.verbose:
+            self._emit('debug', None, None, template, args)
+
+    def error(self, template, *args):
+        """Generates an error message and flushes the buffer.
+
+        Args:
+            template: A message template for `str.format`.
+            args:     The arguments to the template.
+        """
+        self._count('errors')
+        self._emit('error', None, None, template, args, 'Error: ')
+        self.flush()
+
+    def event(self, event, dotfile_path, template, *args):
+        """Records a completed operation, usually on a single dotfile.
+
+        The event is only written in JSON mode, as text mode reports progress with `info`.
+
+        Args:
+            event:        The past tense of the operation, e.g. "specialized". Quiet mode counts
+                          messages by event for its summary.
+            dotfile_path: The relative path to the dotfile or `None`.
+            template:     A message template for `str.format`.
+            args:         The arguments to the template.
+        """
+        self._count(event)
+        if self.mode == MODE_JSON:
+            self._emit('info', event, dotfile_path, template, args)
+
+    def flush(self):
+        """Writes all buffered messages.
+        """
+        if self._buffer:
+            self._stream.write(''.join(self._buffer))
+            self._stream.flush()
+            self._buffer = []
+
+    def info(self, template, *args):
+        """Generates an informational message, which is suppressed in quiet mode.
+
+        Args:
+            template: A message template for `str.format`.
+            args:     The arguments to the template.
+        """
+        if self.mode != MODE_QUIET:
+            self._emit('info', None, None, template, args)
+
+    def summarize(self):
+        """Writes a summary line in quiet mode and flushes the buffer.
+        """
+        if self.mode == MODE_QUIET:
+            counts = ['{} {}'.format(count, event) for event, count in self._counts.items()]
+            self._buffer.append('dotmgr: {} in {:.2f}s\n'.format(', '.join(counts) or 'done',
+                                                                 monotonic() - self._start))
+        self.flush()
+
+    def warning(self, template, *args):
+        """Generates a warning.
+
+        Args:
+            template: A message template for `str.format`.
+            args:     The arguments to the template.
+        """
+        self._count('warnings')
+        self._emit('warning', None, None, template, args, 'Warning: ')
+
+    def _count(self, event):
+        """Increments the counter for an event.
+
+        Args:
+            event: The name of the event.
+        """
+        self._counts[event] = self._counts.get(event, 0) + 1
+
+    def _emit(self, level, event, dotfile_path, template, args, prefix=''):
+        """Formats a message and appends it to the buffer.
+
+        Args:
+            level:        The severity of the message.
+            event:        The operation the message is about or `None`.
+            dotfile_path: The relative path to the dotfile the message is about or `None`.
+            template:     A message template for `str.format`.
+            args:         The arguments to the template.
+            prefix:       A prefix for the message in text and quiet mode. Continuation lines are
+                          indented accordingly.
+        """
+        message = template.format(*args) if args else template
+        if self.mode == MODE_JSON:
+            record = {'time': time(), 'level': level, 'message': message}
+            if event:
+                record['event'] = event
+            if dotfile_path:
+                record['path'] = dotfile_path
+            self._buffer.append(dumps(record) + '\n')
+        else:
+            if prefix:
+                message = prefix + message.replace('\n', '\n' + ' ' * len(prefix))
+            self._buffer.append(message + '\n')
+        if len(self._buffer) >= BUFFER_SIZE:
+            self.flush()
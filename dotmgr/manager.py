@@ -15,28 +15,36 @@
 """A module for dotfile management classes and service functions.
 """
 
+from io import StringIO
 from os import listdir, makedirs, remove, symlink
 from os.path import dirname, exists, expanduser, isdir, islink, join
 from re import findall
 from shutil import move, rmtree
 from socket import gethostname
 
+from dotmgr.hooks import read_hooks, run_hooks
+from dotmgr.paths import DEFAULT_DOTFILE_HOOK_CONFIG_PATH
+
 
 class Manager(object):
     """An instance of this class can be used to manage dotfiles.
 
     Attributes:
+        dotfile_index:           The index of managed dotfiles.
         dotfile_repository:      The dotfile repository.
         dotfile_stage_path:      The absolute path to the dotfile stage directory.
         dotfile_tag_config_path: The absolute path to the dotfile tag configuration file.
-        verbose:                 If set to `True`, debug messages are generated.
+        log:                     The log to write messages to.
+        render_cache:            The cache for specialized dotfiles or `None` if it is disabled.
     """
 
-    def __init__(self, repository, stage_path, tag_config_path, verbose):
+    def __init__(self, repository, stage_path, tag_config_path, index, log, render_cache=None):
+        self.dotfile_index = index
         self.dotfile_repository = repository
         self.dotfile_stage_path = stage_path
         self.dotfile_tag_config_path = tag_config_path
-        self.verbose = verbose
+        self.log = log
+        self.render_cache = render_cache
         self._tags = self._get_tags()
 
     def add(self, dotfile_path, commit):
@@ -48,13 +56,13 @@ class Manager(object):
         """
         source = home_path(dotfile_path)
         if islink(source):
-            if self.verbose:
-                print('File {} is a symlink. It seems it is already managed. \\o/'.format(source))
+            self.log.debug('File {} is a symlink. It seems it is already managed. \\o/', source)
         else:
             destination = self.stage_path(dotfile_path)
-            print('Moving dotfile   {} => {}'.format(source, destination))
+            self.log.info('Moving dotfile   {} => {}', source, destination)
             makedirs(dirname(destination), exist_ok=True)
             move(source, destination)
+            self.log.event('moved', dotfile_path, 'Moved {} to stage', dotfile_path)
             self.link(dotfile_path)
             self.generalize(dotfile_path, False)
 
@@ -69,23 +77,26 @@ class Manager(object):
             rm_repo:      If `True`, the dotfile is also deleted from the repository.
             commit:       If `True`, the removal is automatically committed to the repository.
         """
-        print('Removing {} and its symlink'.format(dotfile_path))
+        self.log.info('Removing {} and its symlink', dotfile_path)
         try:
             remove(home_path(dotfile_path))
         except FileNotFoundError:
-            print('Warning: Symlink for {} not found'.format(dotfile_path))
+            self.log.warning('Symlink for {} not found', dotfile_path)
 
         try:
             remove(self.stage_path(dotfile_path))
+            self.log.event('removed', dotfile_path, 'Removed {} from stage', dotfile_path)
         except FileNotFoundError:
-            print('Warning: {} is not on stage'.format(dotfile_path))
+            self.log.warning('{} is not on stage', dotfile_path)
 
         if rm_repo or commit:
-            print('Removing {} from repository'.format(dotfile_path))
+            self.log.info('Removing {} from repository', dotfile_path)
             try:
                 remove(self.repo_path(dotfile_path))
             except FileNotFoundError:
-                print('Warning: {} is not in the repository'.format(dotfile_path))
+                self.log.warning('{} is not in the repository', dotfile_path)
+
+        self.dotfile_index.remove(dotfile_path)
 
         if commit:
             self.dotfile_repository.remove(dotfile_path)
@@ -93,9 +104,10 @@ class Manager(object):
     def delete_all(self):
         """Removes all symlinks to staged files as well as the files themselves.
         """
-        print('Cleaning')
+        self.log.info('Cleaning')
         self._perform_on_stage(self.delete, False, False)
         rmtree(self.dotfile_stage_path)
+        self.dotfile_index.clear()
 
     def generalize(self, dotfile_path, commit, message=None):
         """Generalizes a dotfile from the stage.
@@ -121,8 +133,8 @@ class Manager(object):
                 if '{0}{0}only'.format(cseq) in line:
                     section_tags = line.split()
                     section_tags = section_tags[1:]
-                    if self.verbose:
-                        print('Found section only for {}'.format(', '.join(section_tags)))
+                    if self.log.verbose:
+                        self.log.debug('Found section only for {}', ', '.join(section_tags))
                     if not [tag for tag in self._tags if tag in section_tags]:
                         dotfile.write(line)
                         strip = True
@@ -131,8 +143,8 @@ class Manager(object):
                 if '{0}{0}not'.format(cseq) in line:
                     section_tags = line.split()
                     section_tags = section_tags[1:]
-                    if self.verbose:
-                        print('Found section not for {}'.format(', '.join(section_tags)))
+                    if self.log.verbose:
+                        self.log.debug('Found section not for {}', ', '.join(section_tags))
                     if [tag for tag in self._tags if tag in section_tags]:
                         dotfile.write(line)
                         strip = True
@@ -148,20 +160,22 @@ class Manager(object):
                 else:
                     dotfile.write(line)
 
-        print('Generalizing ' + dotfile_path)
+        self.log.info('Generalizing {}', dotfile_path)
         specific_content = None
         try:
             with open(self.stage_path(dotfile_path)) as specific_dotfile:
                 specific_content = specific_dotfile.readlines()
         except FileNotFoundError:
-            print('It seems {0} is not handled by dotmgr.\n'
-                  'You can add it with `dotmgr -A {0}`.'.format(dotfile_path))
+            self.log.warning('It seems {0} is not handled by dotmgr.\n'
+                             'You can add it with `dotmgr -A {0}`.', dotfile_path)
         if not specific_content:
             return
 
         makedirs(self.repo_path(dirname(dotfile_path)), exist_ok=True)
         with open(self.repo_path(dotfile_path), 'w') as generic_dotfile:
             filter_and_write(specific_content, generic_dotfile)
+        self.log.event('generalized', dotfile_path, 'Generalized {}', dotfile_path)
+        self.dotfile_index.update(dotfile_path)
 
         if commit:
             self.dotfile_repository.update(dotfile_path, message)
@@ -172,7 +186,7 @@ class Manager(object):
         Args:
             commit: If `True`, the changes are automatically committed to the repository.
         """
-        print('Generalizing all dotfiles')
+        self.log.info('Generalizing all dotfiles')
         self._perform_on_stage(self.generalize, commit)
 
     def _get_tags(self):
@@ -192,10 +206,10 @@ class Manager(object):
             if line.startswith(hostname + ':'):
                 tags = line.split(':')[1]
                 tags = tags.split()
-                if self.verbose:
-                    print('Found tags: {}'.format(', '.join(tags)))
+                if self.log.verbose:
+                    self.log.debug('Found tags: {}', ', '.join(tags))
                 return tags
-        print('Warning: No tags found for this machine!')
+        self.log.warning('No tags found for this machine!')
         return [""]
 
     def _identify_comment_sequence(self, line):
@@ -209,11 +223,10 @@ class Manager(object):
         """
         matches = findall(r'\S+', line)
         if not matches:
-            print('Could not identify a comment character!')
+            self.log.error('Could not identify a comment character!')
             exit()
         seq = matches[0]
-        if self.verbose:
-            print('Identified comment character sequence: {}'.format(seq))
+        self.log.debug('Identified comment character sequence: {}', seq)
         return seq
 
     def link(self, dotfile_path):
@@ -227,9 +240,12 @@ class Manager(object):
             return
 
         dest_path = self.stage_path(dotfile_path)
-        print("Creating symlink {} -> {}".format(link_path, dest_path))
+        self.log.info('Creating symlink {} -> {}', link_path, dest_path)
         makedirs(dirname(link_path), exist_ok=True)
         symlink(dest_path, link_path)
+        self.log.event('linked', dotfile_path, 'Linked {}', dotfile_path)
+        if dotfile_path not in self.dotfile_index:
+            self.dotfile_index.update(dotfile_path)
 
     def link_all(self):
         """Creates missing symlinks to all dotfiles on stage.
@@ -277,16 +293,54 @@ class Manager(object):
         """
         return join(self.dotfile_repository.path, dotfile_name)
 
+    def _run_hooks(self, dotfile_paths):
+        """Runs the hooks triggered by changes to the given dotfiles.
+
+        The hook configuration is read from the stage, so tag-blocks can be used in it.
+
+        Args:
+            dotfile_paths: The relative paths to the dotfiles that have changed.
+
+        Returns:
+            `True` if all triggered hooks succeeded, `False` otherwise.
+        """
+        if not dotfile_paths:
+            return True
+        hooks = read_hooks(self.stage_path(DEFAULT_DOTFILE_HOOK_CONFIG_PATH), self.log)
+        return run_hooks(hooks, dotfile_paths, self.log)
+
     def specialize(self, dotfile_path, link):
         """Specializes a dotfile from the repository.
 
         Identifies and comments out blocks not valid for this host.
         The specialized file is written to the stage directory.
+        If its content changed, the hooks triggered by it are run.
+
+        Args:
+            dotfile_path: The relative path to the dotfile to specialize.
+            link: If set to `True`, a symlink pointing to the specialized file is also created in
+                  the user's home directory.
+
+        Returns:
+            `True` if all triggered hooks succeeded, `False` otherwise.
+        """
+        if self._specialize(dotfile_path, link):
+            return self._run_hooks([dotfile_path])
+        return True
+
+    def _specialize(self, dotfile_path, link):
+        """Specializes a dotfile from the repository without running hooks.
+
+        The stage copy is only rewritten if its content changes. If the render cache is enabled,
+        a cached result is placed on stage instead of filtering the dotfile again.
 
         Args:
             dotfile_path: The relative path to the dotfile to specialize.
             link: If set to `True`, a symlink pointing to the specialized file is also created in
                   the user's home directory.
+
+        Returns:
+            `True` if the content of the dotfile on stage changed, `False` otherwise.
         """
         def filter_and_write(content, dotfile):
             """Filters the content of a generic dotfile and writes a specific one.
@@ -301,8 +355,8 @@ class Manager(object):
                 if '{0}{0}only'.format(cseq) in line:
                     section_tags = line.split()
                     section_tags = section_tags[1:]
-                    if self.verbose:
-                        print('Found section only for {}'.format(', '.join(section_tags)))
+                    if self.log.verbose:
+                        self.log.debug('Found section only for {}', ', '.join(section_tags))
                     if not [tag for tag in self._tags if tag in section_tags]:
                         dotfile.write(line)
                         comment_out = True
@@ -311,8 +365,8 @@ class Manager(object):
                 if '{0}{0}not'.format(cseq) in line:
                     section_tags = line.split()
                     section_tags = section_tags[1:]
-                    if self.verbose:
-                        print('Found section not for {}'.format(', '.join(section_tags)))
+                    if self.log.verbose:
+                        self.log.debug('Found section not for {}', ', '.join(section_tags))
                     if [tag for tag in self._tags if tag in section_tags]:
                         dotfile.write(line)
                         comment_out = True
@@ -327,42 +381,79 @@ class Manager(object):
                 else:
                     dotfile.write(line)
 
-        print('Specializing ' + dotfile_path)
-        generic_content = None
-        with open(self.repo_path(dotfile_path)) as generic_dotfile:
-            generic_content = generic_dotfile.readlines()
-        if not generic_content:
-            return
+        self.log.info('Specializing {}', dotfile_path)
+        cache_key = None
+        changed = None
+        if self.render_cache:
+            with open(self.repo_path(dotfile_path), 'rb') as generic_dotfile:
+                cache_key = self.render_cache.key(generic_dotfile.read(), self._tags)
+            changed = self.render_cache.place(cache_key, self.stage_path(dotfile_path))
+
+        if changed is None:
+            generic_content = None
+            with open(self.repo_path(dotfile_path)) as generic_dotfile:
+                generic_content = generic_dotfile.readlines()
+            if not generic_content:
+                return False
+
+            specific_content = StringIO()
+            filter_and_write(generic_content, specific_content)
+            specific_content = specific_content.getvalue()
+
+            changed = True
+            try:
+                with open(self.stage_path(dotfile_path)) as specific_dotfile:
+                    changed = specific_dotfile.read() != specific_content
+            except FileNotFoundError:
+                pass
 
-        makedirs(self.stage_path(dirname(dotfile_path)), exist_ok=True)
-        with open(self.stage_path(dotfile_path), 'w') as specific_dotfile:
-            filter_and_write(generic_content, specific_dotfile)
+            if changed:
+                makedirs(self.stage_path(dirname(dotfile_path)), exist_ok=True)
+                with open(self.stage_path(dotfile_path), 'w') as specific_dotfile:
+                    specific_dotfile.write(specific_content)
+            if cache_key:
+                self.render_cache.put(cache_key, self.stage_path(dotfile_path))
+
+        if changed:
+            self.log.event('specialized', dotfile_path, 'Specialized {}', dotfile_path)
+        else:
+            self.log.debug('File {} has not changed', dotfile_path)
+        self.dotfile_index.update(dotfile_path)
 
         if link:
             self.link(dotfile_path)
+        return changed
 
     def specialize_all(self, link):
         """Specializes all dotfiles in the repositroy and writes results to the stage.
 
+        Afterwards, the hooks triggered by dotfiles whose content changed are run.
+
         Args:
             link: If set to `True`, symlinks pointing to the staged files are also created in the
                   user's home directory.
+
+        Returns:
+            `True` if all triggered hooks succeeded, `False` otherwise.
         """
 
-        print('Specializing all dotfiles')
+        self.log.info('Specializing all dotfiles')
+        changed = []
         for entry in listdir(self.dotfile_repository.path):
             if isdir(join(self.dotfile_repository.path, entry)):
                 if self.repo_path(entry) == self.dotfile_stage_path \
                 or entry == '.git':
                     continue
-                self._specialize_directory(entry, link)
+                changed += self._specialize_directory(entry, link)
             else:
                 if self.repo_path(entry) == self.dotfile_tag_config_path:
                     continue
-                self.specialize(entry, link)
+                if self._specialize(entry, link):
+                    changed.append(entry)
 
         if link:
             self.link_all()
+        return self._run_hooks(changed)
 
     def _specialize_directory(self, directory_path, link):
         """Recursively specializes a directory of dotfiles from the repository.
@@ -371,15 +462,20 @@ class Manager(object):
             directory_path: The relative path to the directory to specialize.
             link: If set to `True`, symlinks pointing to the staged files are also created in the
                   user's home directory.
+
+        Returns:
+            The relative paths to all dotfiles whose content on stage changed.
         """
+        changed = []
         for entry in listdir(self.repo_path(directory_path)):
             if entry == '.git':
                 continue
             full_path = join(directory_path, entry)
             if isdir(self.repo_path(full_path)):
-                self._specialize_directory(full_path, link)
-            else:
-                self.specialize(full_path, link)
+                changed += self._specialize_directory(full_path, link)
+            elif self._specialize(full_path, link):
+                changed.append(full_path)
+        return changed
 
     def stage_path(self, dotfile_name):
         """Returns the absolute path to a named dotfile on stage.
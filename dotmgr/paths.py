@@ -16,14 +16,65 @@
 """
 
 from os import environ, makedirs
-from os.path import expanduser, isdir, isfile
+from os.path import expanduser, isdir, isfile, join
 
 
 DEFAULT_DOTFILE_REPOSITORY_PATH = '~/.local/share/dotmgr/repository'
 DEFAULT_DOTFILE_STAGE_PATH = '~/.local/share/dotmgr/stage'
+DEFAULT_DOTFILE_HOOK_CONFIG_PATH = '.config/dotmgr/hooks.conf'
 DEFAULT_DOTFILE_TAG_CONFIG_PATH = '.config/dotmgr/tags.conf'
+DEFAULT_DOTFILE_INDEX_PATH = '~/.local/share/dotmgr/index.json'
+DEFAULT_DOTFILE_CACHE_PATH = '~/.cache/dotmgr'
 
-def prepare_dotfile_repository_path(verify, verbose):
+def prepare_dotfile_cache_path(log):
+    """Synthesizes the path to the cache directory for specialized dotfiles.
+
+    If DOTMGR_CACHE is defined, it is read from the environment and returned.
+    Otherwise the directory dotmgr in XDG_CACHE_HOME is used if that is defined, or the
+    DEFAULT_DOTFILE_CACHE_PATH if it is not.
+    If the chosen directory does not exist, it is created automatically and made accessible to the
+    current user only. If that fails, a warning is generated and the cache falls back to uncached
+    specialization.
+
+    Args:
+        log:     The log to write messages to.
+
+    Returns:
+        The (absolute) path to the cache directory.
+    """
+    dotfile_cache_path = expanduser(DEFAULT_DOTFILE_CACHE_PATH)
+    if 'DOTMGR_CACHE' in environ:
+        dotfile_cache_path = environ['DOTMGR_CACHE']
+    elif 'XDG_CACHE_HOME' in environ:
+        dotfile_cache_path = join(environ['XDG_CACHE_HOME'], 'dotmgr')
+
+    log.debug('Using render cache at {}', dotfile_cache_path)
+    try:
+        makedirs(dotfile_cache_path, mode=0o700, exist_ok=True)
+    except OSError as err:
+        log.warning('Could not create cache {}: {}', dotfile_cache_path, err.strerror)
+    return dotfile_cache_path
+
+def prepare_dotfile_index_path(log):
+    """Synthesizes the path to the index of managed dotfiles.
+
+    If DOTMGR_INDEX is defined, it is read from the environment and returned.
+    Otherwise the DEFAULT_DOTFILE_INDEX_PATH is used.
+
+    Args:
+        log:     The log to write messages to.
+
+    Returns:
+        The (absolute) path to the dotfile index.
+    """
+    dotfile_index_path = expanduser(DEFAULT_DOTFILE_INDEX_PATH)
+    if 'DOTMGR_INDEX' in environ:
+        dotfile_index_path = environ['DOTMGR_INDEX']
+
+    log.debug('Using dotfile index at {}', dotfile_index_path)
+    return dotfile_index_path
+
+def prepare_dotfile_repository_path(verify, log):
     """Synthesizes the path to the dotfile repository.
 
     If DOTMGR_REPO is defined, it is read from the environment and returned.
@@ -32,7 +83,7 @@ def prepare_dotfile_repository_path(verify, verbose):
     Args:
         verify:  If set to `True`, the program exits with an error message if the chosen path does
                  not point to a directory.
-        verbose: If set to `True`, this function generates debug messages.
+        log:     The log to write messages to.
 
     Returns:
         The (absolute) path to the dotfile repository.
@@ -42,22 +93,22 @@ def prepare_dotfile_repository_path(verify, verbose):
         dotfile_repository_path = environ['DOTMGR_REPO']
 
     if verify and not isdir(dotfile_repository_path):
-        print('Error: dotfile repository {} does not exist'.format(dotfile_repository_path))
+        log.error('dotfile repository {} does not exist', dotfile_repository_path)
         exit()
 
-    if verbose:
-        print('Using dotfile repository at {}'.format(dotfile_repository_path))
+    log.debug('Using dotfile repository at {}', dotfile_repository_path)
     return dotfile_repository_path
 
-def prepare_dotfile_stage_path(verbose):
+def prepare_dotfile_stage_path(create, log):
     """Synthesizes the path to the dotfile stage directory.
 
     If DOTMGR_STAGE is defined, it is read from the environment and returned.
     Otherwise the DEFAULT_DOTFILE_STAGE_PATH is used.
-    If the chosen directory does not exist, it is created automatically.
+    If the chosen directory does not exist, it can be created automatically.
 
     Args:
-        verbose: If set to `True`, this function generates debug messages.
+        create:  If set to `True`, the directory is created if it does not exist.
+        log:     The log to write messages to.
 
     Returns:
         The (absolute) path to the dotfile stage directory.
@@ -66,15 +117,14 @@ def prepare_dotfile_stage_path(verbose):
     if 'DOTMGR_STAGE' in environ:
         dotfile_stage_path = environ['DOTMGR_STAGE']
 
-    if not isdir(dotfile_stage_path):
-        if verbose:
-            print('Preparing stage at {}'.format(dotfile_stage_path))
+    if isdir(dotfile_stage_path):
+        log.debug('Using stage at {}', dotfile_stage_path)
+    elif create:
+        log.debug('Preparing stage at {}', dotfile_stage_path)
         makedirs(dotfile_stage_path)
-    elif verbose:
-        print('Using stage at {}'.format(dotfile_stage_path))
     return dotfile_stage_path
 
-def prepare_tag_config_path(bootstrap, dotfile_repository_path, verify, verbose):
+def prepare_tag_config_path(bootstrap, dotfile_repository_path, verify, log):
     """Synthesizes the path to the dotfile stage directory.
 
     If DOTMGR_TAG_CONF is defined, it is read from the environment and returned.
@@ -87,7 +137,7 @@ def prepare_tag_config_path(bootstrap, dotfile_repository_path, verify, verbose)
                                  not set).
         verify:  If set to `True`, the program exits with an error message if the chosen path does
                  not point to a file.
-        verbose: If set to `True`, this function generates debug messages.
+        log:     The log to write messages to.
 
     Returns:
         The (absolute) path to the tag configuration file.
@@ -100,12 +150,11 @@ def prepare_tag_config_path(bootstrap, dotfile_repository_path, verify, verbose)
             dotfile_tag_config_path = environ['DOTMGR_TAG_CONF']
 
     if verify and not isfile(dotfile_tag_config_path):
-        print('Error: Tag configuration file "{}" not found!\n'
-              '       You can use -b to bootstrap it from your dotfile repository\n'
-              '       or set $DOTMGR_TAG_CONF to override the default path.'\
-              .format(dotfile_tag_config_path))
+        log.error('Tag configuration file "{}" not found!\n'
+                  'You can use -b to bootstrap it from your dotfile repository\n'
+                  'or set $DOTMGR_TAG_CONF to override the default path.',
+                  dotfile_tag_config_path)
         exit()
 
-    if verbose:
-        print('Using dotfile tags config at {}'.format(dotfile_tag_config_path))
+    log.debug('Using dotfile tags config at {}', dotfile_tag_config_path)
     return dotfile_tag_config_path
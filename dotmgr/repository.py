@@ -28,13 +28,13 @@ class Repository(object):
     """An instance of this class can be used to manage dotfiles.
 
     Attributes:
+        log:     The log to write messages to.
         path:    The absolute path to the dotfile repository.
-        verbose: If set to `True`, debug messages are generated.
     """
 
-    def __init__(self, repository_path, verbose):
+    def __init__(self, repository_path, log):
+        self.log = log
         self.path = repository_path
-        self.verbose = verbose
         self._git_instance = None
 
     def _commit_file(self, dotfile_path, message):
@@ -44,9 +44,49 @@ class Repository(object):
             dotfile_path: The relative path to the dotfile to commit.
             message:      A commit message.
         """
-        print('Committing {}'.format(dotfile_path))
-        _exec_fancy(lambda: self._git().stage(dotfile_path))
-        _exec_fancy(lambda: self._git().commit(message=message))
+        self.log.info('Committing {}', dotfile_path)
+        self._exec_fancy(lambda: self._git().stage(dotfile_path))
+        self._exec_fancy(lambda: self._git().commit(message=message))
+        self.log.event('committed', dotfile_path, 'Committed {}', dotfile_path)
+
+    def _exec_fancy(self, func):
+        """Executes a git command and handles errors gracefully.
+
+        In case of errors a note on what failed and how to re-try the operation is printed and
+        program execution is aborted.
+
+        Args:
+            func:          A function that executes a git command.
+        """
+        try:
+            func()
+        except GitCommandError as err:
+            cmdline = ' '.join(err.command)
+            args = ' '.join(err.command[1:])
+            self.log.error('Sorry, something went wrong during execution of `{}`. :-(\n'
+                           'You can execute `dotmgr -V {}` to try again and find out what '
+                           'happened.', cmdline, args)
+            exit()
+
+    def _exec_raw(self, func):
+        """Executes a git command.
+
+        In case of errors the STDERR output of the command is printed and program execution is
+        aborted.
+
+        Args:
+            func:          A function that executes a git command.
+        """
+        try:
+            return func()
+        except GitCommandError as err:
+            cmdline = ' '.join(err.command)
+            # Forward stderr from git
+            self.log.error('Execution of the command\n'
+                           '{}\n'
+                           'failed with the following message:\n'
+                           '{}', cmdline, err.args[2].decode('utf-8'))
+            exit()
 
     def _git(self):
         """Singleton factory for the Git object.
@@ -55,8 +95,8 @@ class Repository(object):
             try:
                 self._git_instance = Repo(self.path).git
             except InvalidGitRepositoryError:
-                print('Error: {} is not a git repository!\n'
-                      '       You can try running `dotmgr -I` to initialize it.'.format(self.path))
+                self.log.error('{} is not a git repository!\n'
+                               'You can try running `dotmgr -I` to initialize it.', self.path)
                 exit()
         return self._git_instance
 
@@ -67,8 +107,7 @@ class Repository(object):
             dotfile_path: The relative path to the dotfile to commit.
         """
         if dotfile_path in self._git().ls_files():
-            if self.verbose:
-                print('File {} is already tracked - skipping commit'.format(dotfile_path))
+            self.log.debug('File {} is already tracked - skipping commit', dotfile_path)
             return
         self._commit_file(dotfile_path, 'Add {}'.format(dotfile_path))
 
@@ -78,8 +117,8 @@ class Repository(object):
         Args:
             url: The URL of the repository to clone.
         """
-        print('Cloning {} into {}'.format(url, self.path))
-        _exec_raw(lambda: Git().clone(url, self.path))
+        self.log.info('Cloning {} into {}', url, self.path)
+        self._exec_raw(lambda: Git().clone(url, self.path))
 
     def execute(self, args):
         """Executes a git command in the dotfile repository.
@@ -88,9 +127,9 @@ class Repository(object):
             args: Command line arguments for git.
         """
         args.insert(0, 'git')
-        if self.verbose:
-            print('Executing `{}`'.format(' '.join(args)))
-        print(_exec_raw(lambda: self._git().execute(args)))
+        self.log.debug('Executing `{}`', ' '.join(args))
+        self.log.flush()
+        print(self._exec_raw(lambda: self._git().execute(args)))
 
     def initialize(self, tag_config_path):
         """Initializes an empty git repository and creates and commits an initial tag configuration.
@@ -101,18 +140,18 @@ class Repository(object):
             tag_config_path: The (relative) path to the dotfile tag configuration.
         """
         if not isdir(self.path):
-            print('Initializing empty repository in {}'.format(self.path))
-            _exec_raw(lambda: Git().init(self.path))
+            self.log.info('Initializing empty repository in {}', self.path)
+            self._exec_raw(lambda: Git().init(self.path))
 
         try:
             self._git().rev_parse()
         except InvalidGitRepositoryError:
-            print('Initializing repository in existing directory {}'.format(self.path))
-            _exec_raw(lambda: Git(self.path).init())
+            self.log.info('Initializing repository in existing directory {}', self.path)
+            self._exec_raw(lambda: Git(self.path).init())
 
         full_path = join(self.path, tag_config_path)
         if not isfile(full_path):
-            print('Creating initial tag configuration')
+            self.log.info('Creating initial tag configuration')
             makedirs(dirname(full_path), exist_ok=True)
             with open(full_path, 'w') as tag_config:
                 tag_config.write('{0}: {0}'.format(gethostname()))
@@ -121,14 +160,16 @@ class Repository(object):
     def push(self):
         """Pushes to upstream.
         """
-        print('Pushing to upstream')
-        _exec_fancy(lambda: self._git().push())
+        self.log.info('Pushing to upstream')
+        self.log.flush()
+        self._exec_fancy(lambda: self._git().push())
 
     def pull(self):
         """Pulls from upstream.
         """
-        print('Pulling from upstream')
-        _exec_fancy(lambda: self._git().pull())
+        self.log.info('Pulling from upstream')
+        self.log.flush()
+        self._exec_fancy(lambda: self._git().pull())
 
     def remove(self, dotfile_path):
         """Commits the removal of a dotfile.
@@ -136,9 +177,10 @@ class Repository(object):
         Args:
             dotfile_path: The relative path to the dotfile to remove.
         """
-        print('Committing removal of {}'.format(dotfile_path))
-        _exec_fancy(lambda: self._git().rm(dotfile_path, cached=True))
-        _exec_fancy(lambda: self._git().commit(message='Remove {}'.format(dotfile_path)))
+        self.log.info('Committing removal of {}', dotfile_path)
+        self._exec_fancy(lambda: self._git().rm(dotfile_path, cached=True))
+        self._exec_fancy(lambda: self._git().commit(message='Remove {}'.format(dotfile_path)))
+        self.log.event('committed', dotfile_path, 'Committed removal of {}', dotfile_path)
 
     def update(self, dotfile_path, message=None):
         """Commits changes to a dotfile.
@@ -149,48 +191,9 @@ class Repository(object):
         """
         # Skip if the file has not changed
         if not self._git().diff(dotfile_path, name_only=True):
-            if self.verbose:
-                print('File {} has not changed - skipping commit'.format(dotfile_path))
+            self.log.debug('File {} has not changed - skipping commit', dotfile_path)
             return
 
         if not message:
             message = 'Update {}'.format(dotfile_path)
         self._commit_file(dotfile_path, message)
-
-def _exec_fancy(func):
-    """Executes a git command and handles errors gracefully.
-
-    In case of errors a note on what failed and how to re-try the operation is printed and program
-    execution is aborted.
-
-    Args:
-        func:          A function that executes a git command.
-    """
-    try:
-        func()
-    except GitCommandError as err:
-        cmdline = ' '.join(err.command)
-        args = ' '.join(err.command[1:])
-        print('Error: Sorry, something went wrong during execution of `{}`. :-(\n'
-              '       You can execute `dotmgr -V {}` to try again and find out what happened.'
-              .format(cmdline, args))
-        exit()
-
-def _exec_raw(func):
-    """Executes a git command.
-
-    In case of errors the STDERR output of the command is printed and program execution is aborted.
-
-    Args:
-        func:          A function that executes a git command.
-    """
-    try:
-        return func()
-    except GitCommandError as err:
-        cmdline = ' '.join(err.command)
-        print('Error: Execution of the command\n'
-              '       {}\n'
-              '       failed with the following message:'.format(cmdline))
-        # Forward stderr from git
-        print(err.args[2].decode('utf-8'))
-        exit()